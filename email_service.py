@@ -137,6 +137,36 @@ class EmailService:
             logger.error(f"Error sending admin notification email: {str(e)}")
             return False
     
+    def send_order_notifications(self, order) -> None:
+        """Send customer confirmation and admin notification for a completed order."""
+        order_data = {
+            "id": order.id,
+            "paypal_order_id": order.paypal_order_id,
+            "status": order.status.value,
+            "total": order.total,
+            "currency": order.currency,
+            "customer_name": order.customer_name,
+            "customer_email": order.customer_email,
+            "customer_phone": order.customer_phone,
+            "items": [
+                {
+                    "product_name": item.product_name,
+                    "quantity": item.quantity,
+                    "unit_price": item.unit_price,
+                    "total_price": item.total_price,
+                    "currency": order.currency
+                }
+                for item in order.items
+            ]
+        }
+        
+        # Send customer confirmation
+        if order.customer_email:
+            self.send_order_confirmation(order_data, order.customer_email)
+        
+        # Send admin notification
+        self.send_admin_notification(order_data)
+    
     def _send_email(self, to_email: str, subject: str, html_content: str) -> bool:
         """Send email using SMTP."""
         try:
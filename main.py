@@ -1,12 +1,15 @@
 from fastapi import FastAPI, HTTPException, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel, EmailStr
 from typing import Optional, List
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
+from paypal_client import PayPalClient
 from paypal_pay import create_paypal_order, create_paypal_order_from_amount, capture_paypal_order
 from database import engine, get_db, Base
 from models import Order, OrderItem, OrderStatus
@@ -57,9 +60,39 @@ class CreateOrderRequest(BaseModel):
     cart: Optional[List[CartItem]] = None
     customerInfo: Optional[CustomerInfo] = None
 
+class BatchCreateOrderRequest(BaseModel):
+    orders: List[CreateOrderRequest]
+
 class CaptureOrderRequest(BaseModel):
     orderID: str
 
+# Batch order creation limits
+MAX_BATCH_ORDERS = 100
+MAX_BATCH_WORKERS = 10
+
+def build_db_order(request: CreateOrderRequest, paypal_order_id: str) -> Order:
+    """Build an Order with its cart items from a create-order request."""
+    return Order(
+        paypal_order_id=paypal_order_id,
+        status=OrderStatus.CREATED,
+        total=request.total,
+        currency=request.currency,
+        customer_name=request.customerInfo.name if request.customerInfo else None,
+        customer_email=request.customerInfo.email if request.customerInfo else None,
+        customer_phone=request.customerInfo.phone if request.customerInfo else None,
+        customer_address=request.customerInfo.address if request.customerInfo else None,
+        items=[
+            OrderItem(
+                product_name=item.product_name,
+                product_sku=item.product_sku,
+                quantity=item.quantity,
+                unit_price=item.unit_price,
+                total_price=item.total_price,
+            )
+            for item in request.cart or []
+        ],
+    )
+
 # Health check endpoint
 @app.get("/")
 @app.get("/health")
@@ -102,33 +135,9 @@ def create_order(request: CreateOrderRequest, db: Session = Depends(get_db)):
         result = create_paypal_order_from_amount(request.total, request.currency)
         paypal_order_id = result["orderID"]
         
-        # Store order in database
-        db_order = Order(
-            paypal_order_id=paypal_order_id,
-            status=OrderStatus.CREATED,
-            total=request.total,
-            currency=request.currency,
-            customer_name=request.customerInfo.name if request.customerInfo else None,
-            customer_email=request.customerInfo.email if request.customerInfo else None,
-            customer_phone=request.customerInfo.phone if request.customerInfo else None,
-            customer_address=request.customerInfo.address if request.customerInfo else None,
-        )
+        # Store order and cart items in database
+        db_order = build_db_order(request, paypal_order_id)
         db.add(db_order)
-        db.flush()  # Get the order ID
-        
-        # Store cart items if provided
-        if request.cart:
-            for item in request.cart:
-                db_item = OrderItem(
-                    order_id=db_order.id,
-                    product_name=item.product_name,
-                    product_sku=item.product_sku,
-                    quantity=item.quantity,
-                    unit_price=item.unit_price,
-                    total_price=item.total_price,
-                )
-                db.add(db_item)
-        
         db.commit()
         db.refresh(db_order)
         
@@ -143,6 +152,81 @@ def create_order(request: CreateOrderRequest, db: Session = Depends(get_db)):
         logger.error(f"Error creating PayPal order: {str(e)}")
         raise HTTPException(status_code=400, detail={"error": "Failed to create PayPal order"})
 
+@app.post("/api/paypal/create-orders")
+def create_orders_batch(request: BatchCreateOrderRequest, db: Session = Depends(get_db)):
+    """
+    Create several PayPal orders in one call (wholesale partners).
+    
+    Accepts JSON body with:
+    - orders (required): List of create-order payloads (max: 100)
+    
+    PayPal orders are created concurrently and all resulting orders are stored
+    in a single transaction. Entries that fail at PayPal are reported without
+    failing the rest of the batch. If the transaction fails, every entry is
+    reported as failed and the response status is 500.
+    
+    Returns: {"results": [...], "created": int, "failed": int}
+    """
+    if not request.orders:
+        raise HTTPException(status_code=400, detail={"error": "No orders provided"})
+    if len(request.orders) > MAX_BATCH_ORDERS:
+        raise HTTPException(status_code=400, detail={"error": f"Too many orders (max: {MAX_BATCH_ORDERS})"})
+    
+    try:
+        # Fetch the access token once instead of once per worker
+        client = PayPalClient().get_authorized_client()
+    except Exception as e:
+        logger.error(f"Error authorizing PayPal client for batch: {str(e)}")
+        raise HTTPException(status_code=400, detail={"error": "Failed to create PayPal orders"})
+    
+    def create(entry: CreateOrderRequest):
+        try:
+            return create_paypal_order_from_amount(entry.total, entry.currency, client=client)["orderID"], None
+        except Exception as e:
+            return None, e
+    
+    # Create PayPal orders concurrently
+    with ThreadPoolExecutor(max_workers=min(len(request.orders), MAX_BATCH_WORKERS)) as executor:
+        outcomes = list(executor.map(create, request.orders))
+    
+    results = []
+    db_orders = []
+    for index, (entry, (paypal_order_id, error)) in enumerate(zip(request.orders, outcomes)):
+        if error is not None:
+            logger.error(f"Error creating PayPal order for batch entry {index}: {str(error)}")
+            results.append({"index": index, "error": "Failed to create PayPal order"})
+            continue
+        db_orders.append(build_db_order(entry, paypal_order_id))
+        results.append({"index": index, "id": paypal_order_id, "status": "CREATED"})
+    
+    # Store all orders in one transaction
+    if db_orders:
+        try:
+            db.add_all(db_orders)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            paypal_order_ids = [result["id"] for result in results if "id" in result]
+            logger.error(f"Error storing batch orders, PayPal orders not stored: {', '.join(paypal_order_ids)}: {str(e)}")
+            return JSONResponse(status_code=500, content={
+                "results": [
+                    {"index": result["index"], "id": result["id"], "error": "Failed to store order"}
+                    if "id" in result else result
+                    for result in results
+                ],
+                "created": 0,
+                "failed": len(request.orders)
+            })
+    
+    created = len(db_orders)
+    logger.info(f"Created {created} of {len(request.orders)} orders in batch")
+    
+    return {
+        "results": results,
+        "created": created,
+        "failed": len(request.orders) - created
+    }
+
 @app.post("/api/paypal/capture-order")
 def capture_order(request: CaptureOrderRequest, db: Session = Depends(get_db)):
     """
@@ -194,33 +278,7 @@ def capture_order(request: CaptureOrderRequest, db: Session = Depends(get_db)):
         
         # Send confirmation emails
         try:
-            order_data = {
-                "id": db_order.id,
-                "paypal_order_id": db_order.paypal_order_id,
-                "status": db_order.status.value,
-                "total": db_order.total,
-                "currency": db_order.currency,
-                "customer_name": db_order.customer_name,
-                "customer_email": db_order.customer_email,
-                "customer_phone": db_order.customer_phone,
-                "items": [
-                    {
-                        "product_name": item.product_name,
-                        "quantity": item.quantity,
-                        "unit_price": item.unit_price,
-                        "total_price": item.total_price,
-                        "currency": db_order.currency
-                    }
-                    for item in db_order.items
-                ]
-            }
-            
-            # Send customer confirmation
-            if db_order.customer_email:
-                email_service.send_order_confirmation(order_data, db_order.customer_email)
-            
-            # Send admin notification
-            email_service.send_admin_notification(order_data)
+            email_service.send_order_notifications(db_order)
         except Exception as e:
             logger.error(f"Error sending confirmation emails: {str(e)}")
             # Don't fail the capture if email fails
@@ -232,6 +290,7 @@ def capture_order(request: CaptureOrderRequest, db: Session = Depends(get_db)):
     except Exception as e:
         if db_order:
             db_order.status = OrderStatus.FAILED
+            db_order.reconciled_at = None  # Let the reconciliation job check it again
             db.commit()
         logger.error(f"Error capturing PayPal order {request.orderID}: {str(e)}")
         raise HTTPException(status_code=400, detail={"error": "Failed to capture PayPal order"})
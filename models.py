@@ -35,6 +35,7 @@ class Order(Base):
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
     updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
     completed_at = Column(DateTime, nullable=True)
+    reconciled_at = Column(DateTime, nullable=True)  # Last write by the reconciliation job
     
     # Relationships
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
@@ -54,3 +55,15 @@ class OrderItem(Base):
     
     # Relationship
     order = relationship("Order", back_populates="items")
+
+class ReconciliationCheckpoint(Base):
+    __tablename__ = "reconciliation_checkpoints"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_name = Column(String, unique=True, index=True, nullable=False)
+    
+    # Highest order ID processed in the current pass (0 = start from the beginning)
+    last_order_id = Column(Integer, default=0, nullable=False)
+    
+    # Timestamps
+    updated_at = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc), nullable=False)
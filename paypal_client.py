@@ -1,5 +1,6 @@
 import os
-from paypalcheckoutsdk.core import PayPalHttpClient, SandboxEnvironment, LiveEnvironment
+from types import SimpleNamespace
+from paypalcheckoutsdk.core import PayPalHttpClient, PayPalEnvironment, SandboxEnvironment, LiveEnvironment
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -10,9 +11,17 @@ class PayPalClient:
         self.client_id = os.getenv("PAYPAL_CLIENT_ID")
         self.client_secret = os.getenv("PAYPAL_CLIENT_SECRET")
         self.mode = os.getenv("PAYPAL_MODE", "sandbox").lower()
+        self.api_url = os.getenv("PAYPAL_API_URL")
 
-        # Choose environment based on mode
-        if self.mode == "live":
+        # Choose environment based on mode (PAYPAL_API_URL points at a local stub)
+        if self.api_url:
+            self.environment = PayPalEnvironment(
+                client_id=self.client_id,
+                client_secret=self.client_secret,
+                apiUrl=self.api_url,
+                webUrl=self.api_url
+            )
+        elif self.mode == "live":
             self.environment = LiveEnvironment(
                 client_id=self.client_id,
                 client_secret=self.client_secret
@@ -28,3 +37,12 @@ class PayPalClient:
     def get_client(self):
         return self.client
 
+    def get_authorized_client(self):
+        """Return the client with its access token already fetched.
+
+        The SDK fetches the token lazily on the first request, so threads
+        sharing a fresh client would each request their own token.
+        """
+        # Run the SDK's auth injector once on a throwaway request
+        self.client(SimpleNamespace(headers={}))
+        return self.client
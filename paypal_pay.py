@@ -1,14 +1,15 @@
 import json
-from paypalcheckoutsdk.orders import OrdersCreateRequest, OrdersCaptureRequest
+from paypalcheckoutsdk.orders import OrdersCreateRequest, OrdersCaptureRequest, OrdersGetRequest
 from paypal_client import PayPalClient
 
-def create_paypal_order_from_amount(total: float, currency: str = "EUR"):
+def create_paypal_order_from_amount(total: float, currency: str = "EUR", client=None):
     """
     Create a PayPal order from a total amount and currency.
     
     Args:
         total: The total amount for the order
         currency: Currency code (default: EUR)
+        client: Optional PayPal HTTP client to reuse across calls
     
     Returns:
         dict: Contains orderID
@@ -25,32 +26,61 @@ def create_paypal_order_from_amount(total: float, currency: str = "EUR"):
         }]
     })
 
-    client = PayPalClient().get_client()
+    if client is None:
+        client = PayPalClient().get_client()
     response = client.execute(request)
 
     return {"orderID": response.result.id}
 
-def capture_paypal_order(order_id: str):
+def capture_paypal_order(order_id: str, client=None):
     """
     Capture a PayPal order by order ID.
     
     Args:
         order_id: The PayPal order ID to capture
+        client: Optional PayPal HTTP client to reuse across calls
     
     Returns:
         dict: The PayPal capture response
     """
     request = OrdersCaptureRequest(order_id)
     
-    client = PayPalClient().get_client()
+    if client is None:
+        client = PayPalClient().get_client()
     response = client.execute(request)
     
     # Return the full capture result
+    result = response.result.dict()
     return {
-        "id": response.result.id,
-        "status": response.result.status,
-        "payer": response.result.payer if hasattr(response.result, 'payer') else None,
-        "purchase_units": response.result.purchase_units if hasattr(response.result, 'purchase_units') else None
+        "id": result.get("id"),
+        "status": result.get("status"),
+        "payer": result.get("payer"),
+        "purchase_units": result.get("purchase_units")
+    }
+
+def get_paypal_order(order_id: str, client=None):
+    """
+    Fetch the current state of a PayPal order by order ID.
+    
+    Args:
+        order_id: The PayPal order ID to look up
+        client: Optional PayPal HTTP client to reuse across calls
+    
+    Returns:
+        dict: The PayPal order details
+    """
+    request = OrdersGetRequest(order_id)
+    
+    if client is None:
+        client = PayPalClient().get_client()
+    response = client.execute(request)
+    
+    result = response.result.dict()
+    return {
+        "id": result.get("id"),
+        "status": result.get("status"),
+        "payer": result.get("payer"),
+        "purchase_units": result.get("purchase_units")
     }
 
 def create_paypal_order(product_id: int):
@@ -0,0 +1,348 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Optional
+
+from sqlalchemy import bindparam, func, or_, update
+from sqlalchemy.orm import Session
+
+from paypal_client import PayPalClient
+from paypal_pay import get_paypal_order, capture_paypal_order
+from database import engine, SessionLocal, Base
+from models import Order, OrderStatus, ReconciliationCheckpoint
+from email_service import email_service
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "paypal_order_reconciliation"
+
+# Local statuses that may be out of sync with PayPal (FAILED only until the job settles it)
+CANDIDATE_STATUSES = (OrderStatus.CREATED, OrderStatus.APPROVED, OrderStatus.FAILED)
+
+# Columns written by the guarded bulk UPDATE, keeping the stored value when None
+OPTIONAL_COLUMNS = ("paypal_payer_id", "paypal_payer_email", "paypal_capture_id", "completed_at")
+
+# Capture statuses mapped onto local order statuses
+CAPTURE_STATUS_MAP = {
+    "COMPLETED": OrderStatus.COMPLETED,
+    "PENDING": OrderStatus.COMPLETED,
+    "REFUNDED": OrderStatus.REFUNDED,
+    "PARTIALLY_REFUNDED": OrderStatus.REFUNDED,
+    "DECLINED": OrderStatus.FAILED,
+    "FAILED": OrderStatus.FAILED,
+}
+
+def _extract_capture(result: Dict) -> Optional[Dict]:
+    """Return the first capture of a PayPal order, if any."""
+    purchase_units = result.get("purchase_units") or []
+    if not purchase_units:
+        return None
+    captures = (purchase_units[0].get("payments") or {}).get("captures") or []
+    return captures[0] if captures else None
+
+def _parse_paypal_time(value: Optional[str]) -> Optional[datetime]:
+    """Parse a PayPal RFC 3339 timestamp such as 2026-02-10T12:05:00Z."""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+def resolve_status(result: Dict) -> Optional[OrderStatus]:
+    """
+    Map a PayPal order lookup onto a local order status.
+
+    Args:
+        result: The PayPal order details from get_paypal_order
+
+    Returns:
+        OrderStatus or None if the order is still awaiting the customer
+    """
+    paypal_status = result.get("status")
+
+    if paypal_status == "COMPLETED":
+        capture = _extract_capture(result)
+        if capture is None:
+            return OrderStatus.COMPLETED
+        return CAPTURE_STATUS_MAP.get(capture.get("status"), OrderStatus.COMPLETED)
+    if paypal_status == "APPROVED":
+        return OrderStatus.APPROVED
+    if paypal_status == "VOIDED":
+        return OrderStatus.FAILED
+
+    # CREATED, SAVED, PAYER_ACTION_REQUIRED: nothing to correct yet
+    return None
+
+def build_update(row, result: Optional[Dict], not_found: bool = False) -> Optional[Dict]:
+    """
+    Build a bulk UPDATE mapping for one order, or None if it is already in sync.
+
+    A FAILED order that PayPal confirms as failed still gets a mapping, so
+    the write marks it as settled and later passes skip it.
+
+    Args:
+        row: Order row with id and status
+        result: The PayPal order details from get_paypal_order
+        not_found: PayPal returned 404 (order expired or unknown)
+
+    Returns:
+        dict: Column values keyed by attribute name, including the primary key
+    """
+    # Expired or unknown on PayPal, it can never be captured
+    status = OrderStatus.FAILED if not_found else resolve_status(result)
+    if status is None:
+        return None
+    if status == row.status and status != OrderStatus.FAILED:
+        return None
+
+    now = datetime.now(timezone.utc)
+    mapping = {"id": row.id, "status": status, "updated_at": now}
+    if not_found:
+        return mapping
+
+    payer = result.get("payer") or {}
+    if payer.get("payer_id"):
+        mapping["paypal_payer_id"] = payer["payer_id"]
+    if payer.get("email_address"):
+        mapping["paypal_payer_email"] = payer["email_address"]
+
+    capture = _extract_capture(result)
+    if capture and capture.get("id"):
+        mapping["paypal_capture_id"] = capture["id"]
+
+    if status in (OrderStatus.COMPLETED, OrderStatus.REFUNDED):
+        capture = capture or {}
+        mapping["completed_at"] = (
+            _parse_paypal_time(capture.get("create_time"))
+            or _parse_paypal_time(capture.get("update_time"))
+            or now
+        )
+
+    return mapping
+
+def _get_checkpoint(db: Session) -> ReconciliationCheckpoint:
+    checkpoint = db.query(ReconciliationCheckpoint).filter(
+        ReconciliationCheckpoint.job_name == JOB_NAME
+    ).first()
+    if not checkpoint:
+        checkpoint = ReconciliationCheckpoint(job_name=JOB_NAME, last_order_id=0)
+        db.add(checkpoint)
+        db.commit()
+    return checkpoint
+
+def _apply_updates(db: Session, updates, reconciled_at: datetime):
+    """
+    Write a batch of mappings with one guarded executemany UPDATE.
+
+    Each row is only updated if its status still matches the one read before
+    the PayPal lookups, so a concurrent capture_order commit is never
+    overwritten. Rows actually written carry this batch's reconciled_at.
+
+    Args:
+        db: Database session
+        updates: (row, mapping) pairs from build_update
+        reconciled_at: Marker timestamp for this batch
+
+    Returns:
+        list: (id, status) of the rows that were updated
+    """
+    orders = Order.__table__
+    values = {
+        "status": bindparam("b_status", type_=orders.c.status.type),
+        "updated_at": bindparam("b_updated_at", type_=orders.c.updated_at.type),
+        "reconciled_at": bindparam("b_reconciled_at", type_=orders.c.reconciled_at.type),
+    }
+    for column in OPTIONAL_COLUMNS:
+        values[column] = func.coalesce(
+            bindparam(f"b_{column}", type_=orders.c[column].type),
+            orders.c[column],
+        )
+    stmt = update(orders).where(
+        orders.c.id == bindparam("b_id"),
+        orders.c.status == bindparam("b_old_status", type_=orders.c.status.type),
+    ).values(**values)
+
+    params = []
+    for row, mapping in updates:
+        param = {
+            "b_id": row.id,
+            "b_old_status": row.status,
+            "b_status": mapping["status"],
+            "b_updated_at": mapping["updated_at"],
+            "b_reconciled_at": reconciled_at,
+        }
+        for column in OPTIONAL_COLUMNS:
+            param[f"b_{column}"] = mapping.get(column)
+        params.append(param)
+
+    db.execute(stmt, params)
+
+    return db.query(Order.id, Order.status).filter(
+        Order.id.in_([row.id for row, _ in updates]),
+        Order.reconciled_at == reconciled_at,
+    ).all()
+
+def _send_notifications(db: Session, order_ids) -> None:
+    """Send the post-capture emails for orders recovered as COMPLETED."""
+    if not order_ids:
+        return
+    for db_order in db.query(Order).filter(Order.id.in_(order_ids)).all():
+        try:
+            email_service.send_order_notifications(db_order)
+        except Exception as e:
+            logger.error(f"Error sending confirmation emails for order #{db_order.id}: {str(e)}")
+
+def reconcile_orders(
+    db: Session,
+    batch_size: int = 100,
+    max_workers: int = 8,
+    min_age_minutes: int = 30,
+    max_batches: Optional[int] = None,
+    capture_approved: bool = True,
+    fetch_order: Optional[Callable[[str], Dict]] = None,
+    capture_order: Optional[Callable[[str], Dict]] = None,
+) -> Dict:
+    """
+    Reconcile orders stuck in CREATED, APPROVED or FAILED against PayPal.
+
+    Candidate orders are selected in batches by ascending ID, looked up on
+    PayPal with a bounded thread pool and corrected with one bulk UPDATE per
+    batch. The last processed order ID is committed with each batch so an
+    interrupted run resumes where it stopped; a complete pass resets it.
+    Orders the customer approved but never captured are captured here.
+    FAILED orders settled by the job are not looked up again, and orders
+    recovered as COMPLETED get the usual confirmation emails.
+
+    Args:
+        db: Database session
+        batch_size: Number of orders per batch
+        max_workers: Maximum concurrent PayPal lookups
+        min_age_minutes: Skip orders younger than this (checkout may be in progress)
+        max_batches: Stop after this many batches (default: run until done)
+        capture_approved: Capture orders PayPal reports as APPROVED
+        fetch_order: PayPal lookup function (default: get_paypal_order)
+        capture_order: PayPal capture function (default: capture_paypal_order)
+
+    Returns:
+        dict: Run statistics including orders reconciled per second
+    """
+    if fetch_order is None or (capture_approved and capture_order is None):
+        client = PayPalClient().get_authorized_client()
+        if fetch_order is None:
+            fetch_order = lambda order_id: get_paypal_order(order_id, client=client)
+        if capture_order is None:
+            capture_order = lambda order_id: capture_paypal_order(order_id, client=client)
+
+    def lookup(paypal_order_id: str):
+        try:
+            result = fetch_order(paypal_order_id)
+        except Exception as e:
+            return None, e, None
+        if capture_approved and result.get("status") == "APPROVED":
+            try:
+                return capture_order(paypal_order_id), None, None
+            except Exception as e:
+                # Keep the APPROVED lookup, the next pass retries the capture
+                return result, None, e
+        return result, None, None
+
+    checkpoint = _get_checkpoint(db)
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=min_age_minutes)
+    stats = {"checked": 0, "updated": 0, "errors": 0, "batches": 0}
+    notify_seconds = 0.0
+    started = time.monotonic()
+
+    logger.info(f"Starting reconciliation after order #{checkpoint.last_order_id}")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while max_batches is None or stats["batches"] < max_batches:
+            rows = db.query(
+                Order.id,
+                Order.paypal_order_id,
+                Order.status,
+            ).filter(
+                Order.id > checkpoint.last_order_id,
+                Order.status.in_(CANDIDATE_STATUSES),
+                or_(Order.status != OrderStatus.FAILED, Order.reconciled_at.is_(None)),
+                Order.created_at <= cutoff,
+            ).order_by(Order.id).limit(batch_size).all()
+
+            if not rows:
+                # Pass complete, start from the beginning next run
+                checkpoint.last_order_id = 0
+                db.commit()
+                break
+
+            updates = []
+            for row, (result, error, capture_error) in zip(rows, executor.map(lookup, [r.paypal_order_id for r in rows])):
+                if capture_error is not None:
+                    stats["errors"] += 1
+                    logger.error(f"Error capturing PayPal order {row.paypal_order_id}: {str(capture_error)}")
+
+                not_found = getattr(error, "status_code", None) == 404
+                if error is not None and not not_found:
+                    stats["errors"] += 1
+                    logger.error(f"Error fetching PayPal order {row.paypal_order_id}: {str(error)}")
+                    continue
+
+                mapping = build_update(row, result, not_found=not_found)
+                if mapping:
+                    updates.append((row, mapping))
+
+            applied = _apply_updates(db, updates, datetime.now(timezone.utc)) if updates else []
+            checkpoint.last_order_id = rows[-1].id
+            db.commit()
+
+            stats["checked"] += len(rows)
+            stats["updated"] += len(applied)
+            stats["batches"] += 1
+            logger.info(f"Reconciled batch up to order #{rows[-1].id}: {len(applied)} of {len(rows)} updated")
+            if len(applied) < len(updates):
+                logger.info(f"Skipped {len(updates) - len(applied)} orders changed concurrently")
+
+            # Email time is excluded from the throughput figure
+            notify_started = time.monotonic()
+            _send_notifications(db, [order_id for order_id, status in applied if status == OrderStatus.COMPLETED])
+            notify_seconds += time.monotonic() - notify_started
+
+    elapsed = time.monotonic() - started - notify_seconds
+    stats["elapsed_seconds"] = round(elapsed, 3)
+    stats["orders_per_second"] = round(stats["checked"] / elapsed, 2) if elapsed > 0 else 0.0
+
+    logger.info(
+        f"Reconciliation finished: {stats['checked']} checked, {stats['updated']} updated, "
+        f"{stats['errors']} errors in {stats['elapsed_seconds']}s "
+        f"({stats['orders_per_second']} orders/s)"
+    )
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Reconcile stuck orders against PayPal.")
+    parser.add_argument("--batch-size", type=int, default=100, help="Orders per batch (default: 100)")
+    parser.add_argument("--workers", type=int, default=8, help="Concurrent PayPal lookups (default: 8)")
+    parser.add_argument("--min-age", type=int, default=30, help="Skip orders younger than this many minutes (default: 30)")
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many batches")
+    parser.add_argument("--no-capture", action="store_true", help="Do not capture orders PayPal reports as APPROVED")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        reconcile_orders(
+            db,
+            batch_size=args.batch_size,
+            max_workers=args.workers,
+            min_age_minutes=args.min_age,
+            max_batches=args.max_batches,
+            capture_approved=not args.no_capture,
+        )
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keep tests off the development database
+os.environ["DATABASE_URL"] = "sqlite://"
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from database import Base
+import models  # noqa: F401 - register tables on Base
+
+@pytest.fixture
+def session_factory():
+    """Session factory bound to a fresh in-memory SQLite database."""
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    Base.metadata.create_all(bind=engine)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
+
+@pytest.fixture
+def db(session_factory):
+    session = session_factory()
+    try:
+        yield session
+    finally:
+        session.close()
+
+class PayPalStub:
+    """Minimal local PayPal API serving OAuth tokens, order creation, lookups and captures."""
+
+    def __init__(self):
+        self.orders = {}
+        self.requested = []
+        self.captured = []
+        self.token_requests = 0
+        self.created = 0
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, code, body):
+                payload = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                if self.path == "/v1/oauth2/token":
+                    with stub.lock:
+                        stub.token_requests += 1
+                    self._send(200, {"access_token": "stub-token", "token_type": "Bearer", "expires_in": 3600})
+                elif self.path == "/v2/checkout/orders":
+                    with stub.lock:
+                        stub.created += 1
+                        order_id = f"PP-NEW-{stub.created}"
+                    self._send(201, {"id": order_id, "status": "CREATED"})
+                elif self.path.startswith("/v2/checkout/orders/") and self.path.endswith("/capture"):
+                    order_id = self.path[len("/v2/checkout/orders/"):-len("/capture")]
+                    code, body = stub.orders.get(order_id, (404, {}))
+                    if code != 200 or body.get("status") != "APPROVED":
+                        self._send(422, {"name": "UNPROCESSABLE_ENTITY"})
+                        return
+                    stub.captured.append(order_id)
+                    stub.completed(order_id)
+                    self._send(201, stub.orders[order_id][1])
+                else:
+                    self._send(404, {"name": "RESOURCE_NOT_FOUND"})
+
+            def do_GET(self):
+                prefix = "/v2/checkout/orders/"
+                if not self.path.startswith(prefix):
+                    self._send(404, {"name": "RESOURCE_NOT_FOUND"})
+                    return
+                order_id = self.path[len(prefix):]
+                stub.requested.append(order_id)
+                code, body = stub.orders.get(order_id, (404, {"name": "RESOURCE_NOT_FOUND"}))
+                self._send(code, body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def completed(self, order_id, capture_status="COMPLETED"):
+        self.orders[order_id] = (200, {
+            "id": order_id,
+            "status": "COMPLETED",
+            "payer": {"payer_id": f"PAYER-{order_id}", "email_address": f"{order_id.lower()}@example.com"},
+            "purchase_units": [{
+                "payments": {"captures": [{
+                    "id": f"CAPTURE-{order_id}",
+                    "status": capture_status,
+                    "create_time": "2026-02-10T12:05:00Z",
+                    "update_time": "2026-02-10T12:06:00Z",
+                }]}
+            }],
+        })
+
+    def status(self, order_id, status):
+        self.orders[order_id] = (200, {"id": order_id, "status": status})
+
+@pytest.fixture
+def paypal_stub(monkeypatch):
+    stub = PayPalStub()
+    stub.thread.start()
+    monkeypatch.setenv("PAYPAL_API_URL", stub.url)
+    monkeypatch.setenv("PAYPAL_CLIENT_ID", "stub-client")
+    monkeypatch.setenv("PAYPAL_CLIENT_SECRET", "stub-secret")
+    yield stub
+    stub.server.shutdown()
+    stub.server.server_close()
@@ -0,0 +1,156 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import paypal_pay
+from database import get_db
+from models import Order, OrderItem, OrderStatus
+
+CART = [{"product_name": "Custom Frame", "product_sku": "FRAME-001", "quantity": 2, "unit_price": 10.0, "total_price": 20.0}]
+
+@pytest.fixture
+def client(db, paypal_stub):
+    def override_get_db():
+        yield db
+
+    main.app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+@pytest.fixture
+def paypal_calls(monkeypatch):
+    """Stub PayPal order creation; totals ending in .13 fail."""
+    calls = []
+    lock = threading.Lock()
+
+    def create(total, currency="EUR", client=None):
+        with lock:
+            calls.append({"total": total, "currency": currency, "client": client})
+            number = len(calls)
+        if round(total % 1, 2) == 0.13:
+            raise RuntimeError("PayPal unavailable")
+        return {"orderID": f"PP-{total}-{number}"}
+
+    monkeypatch.setattr(main, "create_paypal_order_from_amount", create)
+    return calls
+
+def test_batch_reports_partial_success_per_entry(client, db, paypal_calls):
+    response = client.post("/api/paypal/create-orders", json={"orders": [
+        {"total": 10.0},
+        {"total": 11.13},
+        {"total": 12.0, "currency": "USD"},
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["status"] == "CREATED"
+    assert body["results"][1] == {"index": 1, "error": "Failed to create PayPal order"}
+    assert body["results"][2]["status"] == "CREATED"
+    assert body["created"] == 2
+    assert body["failed"] == 1
+
+    stored = {order.paypal_order_id: order for order in db.query(Order).all()}
+    assert set(stored) == {body["results"][0]["id"], body["results"][2]["id"]}
+    assert stored[body["results"][2]["id"]].currency == "USD"
+    assert all(order.status == OrderStatus.CREATED for order in stored.values())
+
+def test_batch_shares_one_paypal_client(client, paypal_calls):
+    client.post("/api/paypal/create-orders", json={"orders": [{"total": 10.0}, {"total": 12.0}]})
+
+    assert paypal_calls[0]["client"] is not None
+    assert paypal_calls[0]["client"] is paypal_calls[1]["client"]
+
+def test_batch_stores_order_items(client, db, paypal_calls):
+    response = client.post("/api/paypal/create-orders", json={"orders": [
+        {"total": 20.0, "cart": CART, "customerInfo": {"name": "John Doe", "email": "john@example.com"}},
+    ]})
+
+    assert response.status_code == 200
+    order = db.query(Order).one()
+    assert order.customer_name == "John Doe"
+    assert [(item.product_sku, item.quantity) for item in order.items] == [("FRAME-001", 2)]
+    assert db.query(OrderItem).filter(OrderItem.order_id == order.id).count() == 1
+
+@pytest.mark.parametrize("orders", [[], [{"total": 1.0}] * (main.MAX_BATCH_ORDERS + 1)])
+def test_batch_size_is_validated(client, paypal_calls, orders):
+    response = client.post("/api/paypal/create-orders", json={"orders": orders})
+
+    assert response.status_code == 400
+    assert paypal_calls == []
+
+def test_batch_commit_failure_reports_created_paypal_orders(client, db, paypal_calls):
+    def failing_commit():
+        raise RuntimeError("database unavailable")
+
+    db.commit = failing_commit
+
+    response = client.post("/api/paypal/create-orders", json={"orders": [{"total": 10.0}, {"total": 11.13}]})
+
+    assert response.status_code == 500
+    body = response.json()
+    assert body["results"][0]["id"].startswith("PP-10.0")
+    assert body["results"][0]["error"] == "Failed to store order"
+    assert body["results"][1] == {"index": 1, "error": "Failed to create PayPal order"}
+    assert body["created"] == 0
+    assert body["failed"] == 2
+
+def test_batch_creates_paypal_orders_concurrently(client, monkeypatch):
+    delay = 0.3
+
+    def slow_create(total, currency="EUR", client=None):
+        time.sleep(delay)
+        return {"orderID": f"PP-{total}"}
+
+    monkeypatch.setattr(main, "create_paypal_order_from_amount", slow_create)
+    orders = [{"total": float(i)} for i in range(main.MAX_BATCH_WORKERS)]
+
+    started = time.monotonic()
+    response = client.post("/api/paypal/create-orders", json={"orders": orders})
+    elapsed = time.monotonic() - started
+
+    assert response.json()["created"] == len(orders)
+    assert elapsed < delay * 3
+
+def test_batch_fetches_access_token_once(client, paypal_stub):
+    orders = [{"total": float(i)} for i in range(main.MAX_BATCH_WORKERS)]
+
+    response = client.post("/api/paypal/create-orders", json={"orders": orders})
+
+    body = response.json()
+    assert body["created"] == len(orders)
+    assert len({result["id"] for result in body["results"]}) == len(orders)
+    assert paypal_stub.created == len(orders)
+    assert paypal_stub.token_requests == 1
+
+def test_create_order_stores_items(client, db, paypal_calls):
+    response = client.post("/api/paypal/create-order", json={"total": 20.0, "cart": CART})
+
+    assert response.status_code == 200
+    order = db.query(Order).filter(Order.paypal_order_id == response.json()["id"]).one()
+    assert [(item.product_name, item.total_price) for item in order.items] == [("Custom Frame", 20.0)]
+
+def test_create_paypal_order_from_amount_reuses_client(monkeypatch):
+    class Response:
+        class result:
+            id = "PP-1"
+
+    class FakeClient:
+        def __init__(self):
+            self.requests = []
+
+        def execute(self, request):
+            self.requests.append(request)
+            return Response
+
+    def no_client():
+        raise AssertionError("a new PayPal client should not be created")
+
+    monkeypatch.setattr(paypal_pay, "PayPalClient", no_client)
+    fake = FakeClient()
+
+    assert paypal_pay.create_paypal_order_from_amount(10.0, "EUR", client=fake) == {"orderID": "PP-1"}
+    assert fake.requests[0].body["purchase_units"][0]["amount"] == {"currency_code": "EUR", "value": "10.0"}
@@ -0,0 +1,237 @@
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import reconcile
+from models import Order, OrderItem, OrderStatus, ReconciliationCheckpoint
+
+OLD = datetime.now(timezone.utc) - timedelta(hours=2)
+
+@pytest.fixture
+def notifications(monkeypatch):
+    sent = []
+    monkeypatch.setattr(reconcile.email_service, "send_order_notifications", lambda order: sent.append(order.id))
+    return sent
+
+def add_order(db, paypal_order_id, status=OrderStatus.CREATED, created_at=OLD):
+    order = Order(
+        paypal_order_id=paypal_order_id,
+        status=status,
+        total=29.99,
+        currency="EUR",
+        customer_email="john@example.com",
+        created_at=created_at,
+        items=[OrderItem(product_name="Custom Frame", quantity=1, unit_price=29.99, total_price=29.99)],
+    )
+    db.add(order)
+    db.commit()
+    return order
+
+def test_created_order_is_completed_with_payer_and_capture(db, paypal_stub, notifications):
+    order = add_order(db, "PP-1")
+    paypal_stub.completed("PP-1")
+
+    stats = reconcile.reconcile_orders(db)
+
+    db.refresh(order)
+    assert order.status == OrderStatus.COMPLETED
+    assert order.paypal_payer_id == "PAYER-PP-1"
+    assert order.paypal_payer_email == "pp-1@example.com"
+    assert order.paypal_capture_id == "CAPTURE-PP-1"
+    assert order.completed_at == datetime(2026, 2, 10, 12, 5)
+    assert notifications == [order.id]
+    assert stats["checked"] == 1
+    assert stats["updated"] == 1
+
+def test_failed_order_with_captured_payment_is_completed(db, paypal_stub, notifications):
+    order = add_order(db, "PP-1", status=OrderStatus.FAILED)
+    paypal_stub.completed("PP-1")
+
+    reconcile.reconcile_orders(db)
+
+    db.refresh(order)
+    assert order.status == OrderStatus.COMPLETED
+    assert order.paypal_capture_id == "CAPTURE-PP-1"
+    assert notifications == [order.id]
+
+def test_approved_order_is_captured(db, paypal_stub, notifications):
+    order = add_order(db, "PP-1")
+    paypal_stub.status("PP-1", "APPROVED")
+
+    stats = reconcile.reconcile_orders(db)
+
+    db.refresh(order)
+    assert paypal_stub.captured == ["PP-1"]
+    assert order.status == OrderStatus.COMPLETED
+    assert order.paypal_capture_id == "CAPTURE-PP-1"
+    assert notifications == [order.id]
+    assert stats["errors"] == 0
+
+def test_approved_order_stays_candidate_without_capture(db, paypal_stub, notifications):
+    order = add_order(db, "PP-1")
+    paypal_stub.status("PP-1", "APPROVED")
+
+    reconcile.reconcile_orders(db, capture_approved=False)
+    db.refresh(order)
+    assert order.status == OrderStatus.APPROVED
+    assert paypal_stub.captured == []
+    assert notifications == []
+
+    paypal_stub.completed("PP-1")
+    reconcile.reconcile_orders(db, capture_approved=False)
+    db.refresh(order)
+    assert order.status == OrderStatus.COMPLETED
+    assert notifications == [order.id]
+
+def test_failed_capture_is_counted_and_retried(db, paypal_stub, notifications):
+    order = add_order(db, "PP-1")
+    paypal_stub.status("PP-1", "APPROVED")
+
+    stats = reconcile.reconcile_orders(db, capture_order=lambda order_id: 1 / 0)
+
+    db.refresh(order)
+    assert order.status == OrderStatus.APPROVED
+    assert stats["errors"] == 1
+
+    reconcile.reconcile_orders(db)
+    db.refresh(order)
+    assert order.status == OrderStatus.COMPLETED
+
+def test_not_found_marks_order_failed(db, paypal_stub, notifications):
+    created = add_order(db, "PP-1")
+    approved = add_order(db, "PP-2", status=OrderStatus.APPROVED)
+
+    stats = reconcile.reconcile_orders(db)
+
+    db.refresh(created)
+    db.refresh(approved)
+    assert created.status == OrderStatus.FAILED
+    assert approved.status == OrderStatus.FAILED
+    assert stats["updated"] == 2
+    assert stats["errors"] == 0
+    assert notifications == []
+
+def test_server_error_is_counted_and_order_left_unchanged(db, paypal_stub, notifications):
+    order = add_order(db, "PP-1")
+    paypal_stub.orders["PP-1"] = (500, {"name": "INTERNAL_SERVER_ERROR"})
+
+    stats = reconcile.reconcile_orders(db)
+
+    db.refresh(order)
+    assert order.status == OrderStatus.CREATED
+    assert stats["errors"] == 1
+    assert stats["updated"] == 0
+
+def test_settled_failed_orders_are_not_fetched_again(db, paypal_stub, notifications):
+    expired = add_order(db, "PP-1")
+    failed = add_order(db, "PP-2", status=OrderStatus.FAILED)
+    paypal_stub.status("PP-3", "VOIDED")
+    voided = add_order(db, "PP-3", status=OrderStatus.FAILED)
+
+    reconcile.reconcile_orders(db)
+    assert sorted(paypal_stub.requested) == ["PP-1", "PP-2", "PP-3"]
+    for order in (expired, failed, voided):
+        db.refresh(order)
+        assert order.status == OrderStatus.FAILED
+        assert order.reconciled_at is not None
+
+    stats = reconcile.reconcile_orders(db)
+    assert len(paypal_stub.requested) == 3
+    assert stats["checked"] == 0
+
+@pytest.mark.parametrize("paypal_status", ["APPROVED", "COMPLETED"])
+def test_concurrent_capture_is_not_overwritten(db, session_factory, notifications, paypal_status):
+    order = add_order(db, "PP-1")
+
+    def fetch_order(paypal_order_id):
+        # capture_order commits while the job waits for PayPal
+        other = session_factory()
+        other.query(Order).filter(Order.paypal_order_id == paypal_order_id).update(
+            {"status": OrderStatus.COMPLETED, "paypal_capture_id": "CAPTURE-WEB"}
+        )
+        other.commit()
+        other.close()
+        return {
+            "id": paypal_order_id,
+            "status": paypal_status,
+            "purchase_units": [{"payments": {"captures": [{"id": "CAPTURE-JOB", "status": "COMPLETED"}]}}],
+        }
+
+    stats = reconcile.reconcile_orders(db, fetch_order=fetch_order, capture_approved=False)
+
+    db.refresh(order)
+    assert order.status == OrderStatus.COMPLETED
+    assert order.paypal_capture_id == "CAPTURE-WEB"
+    assert order.reconciled_at is None
+    assert stats["updated"] == 0
+    assert notifications == []
+
+def test_recent_orders_are_skipped(db, paypal_stub, notifications):
+    order = add_order(db, "PP-1", created_at=datetime.now(timezone.utc))
+    paypal_stub.completed("PP-1")
+
+    stats = reconcile.reconcile_orders(db, min_age_minutes=30)
+
+    db.refresh(order)
+    assert order.status == OrderStatus.CREATED
+    assert stats["checked"] == 0
+    assert paypal_stub.requested == []
+
+def test_interrupted_run_resumes_from_checkpoint(db, paypal_stub, notifications):
+    orders = [add_order(db, f"PP-{i}") for i in range(3)]
+    for order in orders:
+        paypal_stub.status(order.paypal_order_id, "CREATED")
+
+    reconcile.reconcile_orders(db, batch_size=2, max_batches=1)
+
+    checkpoint = db.query(ReconciliationCheckpoint).filter(
+        ReconciliationCheckpoint.job_name == reconcile.JOB_NAME
+    ).one()
+    assert checkpoint.last_order_id == orders[1].id
+    assert sorted(paypal_stub.requested) == ["PP-0", "PP-1"]
+
+    stats = reconcile.reconcile_orders(db, batch_size=2)
+
+    db.refresh(checkpoint)
+    assert paypal_stub.requested[2:] == ["PP-2"]
+    assert stats["checked"] == 1
+    assert checkpoint.last_order_id == 0
+
+def test_throughput_is_reported(db, paypal_stub, notifications):
+    for i in range(5):
+        add_order(db, f"PP-{i}")
+        paypal_stub.completed(f"PP-{i}")
+
+    stats = reconcile.reconcile_orders(db, batch_size=2, max_workers=4)
+
+    assert stats["checked"] == 5
+    assert stats["batches"] == 3
+    assert stats["elapsed_seconds"] > 0
+    assert stats["orders_per_second"] > 0
+
+def test_throughput_excludes_email_time(db, paypal_stub, monkeypatch):
+    monkeypatch.setattr(reconcile.email_service, "send_order_notifications", lambda order: time.sleep(0.5))
+    add_order(db, "PP-1")
+    paypal_stub.completed("PP-1")
+
+    stats = reconcile.reconcile_orders(db)
+
+    assert stats["updated"] == 1
+    assert stats["elapsed_seconds"] < 0.5
+
+def test_build_update_transitions():
+    class Row:
+        id = 1
+        status = OrderStatus.FAILED
+
+    # Confirmed failures are written once to mark them settled
+    assert reconcile.build_update(Row, None, not_found=True)["status"] == OrderStatus.FAILED
+    assert reconcile.build_update(Row, {"status": "VOIDED"})["status"] == OrderStatus.FAILED
+    assert reconcile.build_update(Row, {"status": "CREATED"}) is None
+    assert reconcile.build_update(Row, {"status": "APPROVED"})["status"] == OrderStatus.APPROVED
+    refunded = {
+        "status": "COMPLETED",
+        "purchase_units": [{"payments": {"captures": [{"id": "C", "status": "REFUNDED"}]}}],
+    }
+    assert reconcile.build_update(Row, refunded)["status"] == OrderStatus.REFUNDED